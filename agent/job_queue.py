@@ -0,0 +1,372 @@
+import os
+import json
+import time
+import base64
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import contextlib
+import multiprocessing
+
+# The spool is a single SQLite file. Point JOB_QUEUE_PATH at a shared location
+# to let workers on several machines pull from the same queue. Claims are only
+# exclusive if that file system implements POSIX locks correctly (see README);
+# NFS mounted with nolock and most FUSE mounts do not.
+DEFAULT_DB_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join("spool", "jobs.db"))
+
+# A running job whose lease is not renewed within this window is assumed to
+# belong to a dead worker and is handed out again.
+LEASE_SECONDS = int(os.getenv("JOB_QUEUE_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+
+# Finished jobs are deleted after this long. It also bounds the per-user
+# history the fairness ordering in CLAIM_QUERY has to look at.
+RETENTION_SECONDS = int(os.getenv("JOB_QUEUE_RETENTION_SECONDS", str(7 * 24 * 3600)))
+PURGE_INTERVAL = 3600
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    task TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    depends_on TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, priority);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_started ON jobs (user_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+"""
+
+# Jobs wait until the job they depend on has finished. Then highest priority first. Within a priority level, users with fewer running
+# jobs go first, then the user who was served least recently, so one user
+# uploading a whole course cannot starve everyone else.
+CLAIM_QUERY = """
+SELECT j.id FROM jobs j
+WHERE j.status = 'queued'
+    AND NOT EXISTS (SELECT 1 FROM jobs d
+                    WHERE d.id = j.depends_on AND d.status IN ('queued', 'running'))
+ORDER BY j.priority DESC,
+    (SELECT COUNT(*) FROM jobs r
+     WHERE r.user_id = j.user_id AND r.status = 'running') ASC,
+    COALESCE((SELECT MAX(s.started_at) FROM jobs s
+              WHERE s.user_id = j.user_id), 0) ASC,
+    j.created_at ASC
+LIMIT 1
+"""
+
+
+class JobQueue:
+    """
+    Durable job queue for study-pack generation, backed by SQLite.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Spools created before job dependencies existed
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "depends_on" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN depends_on TEXT")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Autocommit mode; multi-statement updates open their own transaction.
+        # The default rollback journal is kept because WAL does not work on
+        # network file systems.
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, text, user_id="anonymous", priority=0, task="Generate Study Pack", depends_on=None):
+        """
+        Adds a job to the queue.
+        Args:
+            text (str): The document text to process.
+            user_id (str): Owner of the job, used for fairness between users.
+            priority (int): Higher values are picked up first.
+            task (str): Any task type accepted by Orchestrator.handle_request.
+            depends_on (str): Optional job id; this job is not started before it finishes.
+        Returns:
+            str: The job id.
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, user_id, task, payload, priority, status, created_at, depends_on) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, user_id, task, text, priority, STATUS_QUEUED, time.time(), depends_on)
+            )
+        return job_id
+
+    def status(self, job_id):
+        """
+        Returns the job's metadata as a dict, or None if the job is unknown.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, user_id, task, priority, status, attempts, worker, "
+                "created_at, started_at, finished_at, error FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def result(self, job_id):
+        """
+        Returns the stored result of a finished job, or None if it is not done yet.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = ?",
+                (job_id, STATUS_DONE)
+            ).fetchone()
+        if row is None or row["result"] is None:
+            return None
+        return json.loads(row["result"])
+
+    def claim(self, worker_id):
+        """
+        Leases the next job to a worker.
+        Returns: dict with the job's id, task and payload, or None if the queue is empty.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            try:
+                # IMMEDIATE takes the write lock up front so two workers
+                # cannot claim the same job.
+                conn.execute("BEGIN IMMEDIATE")
+
+                # Give up on jobs whose worker stopped renewing its lease
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL, lease_expires_at = NULL "
+                    "WHERE status = ? AND lease_expires_at < ? AND attempts < ?",
+                    (STATUS_QUEUED, STATUS_RUNNING, now, MAX_ATTEMPTS)
+                )
+                conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, error = ?, payload = '' "
+                    "WHERE status = ? AND lease_expires_at < ?",
+                    (STATUS_FAILED, now, "Worker lost too many times.", STATUS_RUNNING, now)
+                )
+
+                row = conn.execute(CLAIM_QUERY).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, lease_expires_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, worker_id, now, now + LEASE_SECONDS, row["id"])
+                )
+                job = conn.execute(
+                    "SELECT id, user_id, task, payload FROM jobs WHERE id = ?",
+                    (row["id"],)
+                ).fetchone()
+                conn.execute("COMMIT")
+                return dict(job)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def cancel(self, job_id):
+        """
+        Cancels a queued or running job. A running job's result is discarded.
+        Returns: True if the job was still pending.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_expires_at = NULL, payload = '' "
+                "WHERE id = ? AND status IN (?, ?)",
+                (STATUS_CANCELLED, time.time(), job_id, STATUS_QUEUED, STATUS_RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def is_cancelled(self, job_id):
+        """
+        Lets a worker check between steps whether it should stop.
+        """
+        job = self.status(job_id)
+        return job is not None and job["status"] == STATUS_CANCELLED
+
+    def count_recent(self, user_id, task, since):
+        """
+        Counts the jobs of one task type a user submitted after the given timestamp.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND task = ? AND created_at >= ?",
+                (user_id, task, since)
+            ).fetchone()
+        return row[0]
+
+    def heartbeat(self, job_id, worker_id):
+        """
+        Renews the lease on a running job. Returns False if the worker lost it.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + LEASE_SECONDS, job_id, worker_id, STATUS_RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        """
+        Stores the result of a job. Ignored if the lease was handed to another worker.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ?, lease_expires_at = NULL, "
+                "payload = '' WHERE id = ? AND worker = ? AND status = ?",
+                (STATUS_DONE, json.dumps(result), time.time(), job_id, worker_id, STATUS_RUNNING)
+            )
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Marks a job as failed with the given error message.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL, "
+                "payload = '' WHERE id = ? AND worker = ? AND status = ?",
+                (STATUS_FAILED, str(error), time.time(), job_id, worker_id, STATUS_RUNNING)
+            )
+
+    def purge(self, older_than=None):
+        """
+        Deletes jobs that finished more than older_than seconds ago.
+        Returns: number of deleted jobs.
+        """
+        older_than = RETENTION_SECONDS if older_than is None else older_than
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED, time.time() - older_than)
+            )
+        return cursor.rowcount
+
+
+def _keep_lease(queue, job_id, worker_id, stop_event):
+    """
+    Renews the job lease in the background while the worker is busy.
+    """
+    while not stop_event.wait(LEASE_SECONDS / 3):
+        if not queue.heartbeat(job_id, worker_id):
+            return
+
+
+def _attach_visualization(result):
+    """
+    Embeds the rendered concept map in the result, because the app may run
+    on another machine and cannot read the worker's visualizations folder.
+    """
+    if not isinstance(result, dict):
+        return result
+    visualization = result.get("visualization", "")
+    if "successfully" not in visualization:
+        return result
+
+    image_path = visualization.split(": ", 1)[1].strip()
+    if os.path.exists(image_path):
+        with open(image_path, "rb") as f:
+            result["visualization_png"] = base64.b64encode(f.read()).decode("ascii")
+    return result
+
+
+def run_worker(db_path=None, poll_interval=1.0, worker_id=None):
+    """
+    Pulls jobs from the queue forever and runs them through the Orchestrator.
+    """
+    # Imported here so that submitting jobs does not require the Watsonx SDK
+    from agent.orchestrator import Orchestrator
+
+    queue = JobQueue(db_path)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    orchestrator = Orchestrator()
+    print(f"[JobQueue] Worker {worker_id} started on {queue.db_path}")
+    last_purge = 0
+
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            # Housekeeping only while idle, so it never delays a job
+            if time.time() - last_purge > PURGE_INTERVAL:
+                queue.purge()
+                orchestrator.cache.purge()
+                last_purge = time.time()
+            time.sleep(poll_interval)
+            continue
+
+        print(f"[JobQueue] Worker {worker_id} running job {job['id']} ({job['task']})")
+        stop_event = threading.Event()
+        keeper = threading.Thread(
+            target=_keep_lease, args=(queue, job["id"], worker_id, stop_event), daemon=True
+        )
+        keeper.start()
+        try:
+            if job["task"] == "Precompute":
+                # Speculative jobs stop early once the user moves on
+                result = orchestrator.precompute(
+                    job["payload"], is_cancelled=lambda: queue.is_cancelled(job["id"])
+                )
+            else:
+                result = _attach_visualization(orchestrator.handle_request(job["task"], job["payload"]))
+            queue.complete(job["id"], worker_id, result)
+        except Exception as e:
+            print(f"[JobQueue] ERROR: job {job['id']} failed: {e}")
+            queue.fail(job["id"], worker_id, e)
+        finally:
+            stop_event.set()
+
+
+def start_workers(num_workers, db_path=None):
+    """
+    Starts worker processes on this machine.
+    Returns: list of the started multiprocessing.Process objects.
+    """
+    # spawn avoids forking a process that already runs threads (e.g. Streamlit)
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(num_workers):
+        process = context.Process(target=run_worker, args=(db_path,), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run study-pack workers against a job spool.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to the shared SQLite spool.")
+    args = parser.parse_args()
+
+    workers = start_workers(args.workers, args.db)
+    for worker in workers:
+        worker.join()
@@ -1,9 +1,44 @@
+import json
 from utils.watsonx_client import WatsonxClient
+from utils.result_cache import ResultCache
 from agent.skills import extract_concepts, generate_roadmap, create_summary, visualize_concepts, search_pdfs
 
+def _is_valid(skill, result):
+    """
+    Checks that a skill returned its expected JSON rather than an error.
+    Error messages cannot be recognized by prefix alone: clean_json_string
+    strips the text around any JSON an API error happens to contain.
+    """
+    try:
+        data = json.loads(result)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(data, dict) and skill.RESULT_KEY in data
+
+
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.client = WatsonxClient()
+        self.cache = cache if cache is not None else ResultCache()
+
+    def _run_skill(self, skill, data):
+        """
+        Runs a model-backed skill, reusing a cached result for the same prompt.
+        """
+        stage = skill.__name__.rsplit(".", 1)[-1]
+        prompt = skill.build_prompt(data)
+        model_id, params = self.client.model_id, self.client.params
+
+        # In record mode every prompt must reach the client to be recorded
+        if self.client.mode != "record":
+            cached = self.cache.get(stage, prompt, model_id, params)
+            if cached is not None:
+                return cached
+
+        result = skill.execute(self.client, data)
+        if _is_valid(skill, result):
+            self.cache.put(stage, prompt, model_id, params, result)
+        return result
 
     def generate_study_pack(self, text):
         """
@@ -13,14 +48,14 @@ class Orchestrator:
         3. Create Summary (Step 6)
         """
         # Step 4: Concept Extraction
-        concepts_json = extract_concepts.execute(self.client, text)
+        concepts_json = self._run_skill(extract_concepts, text)
         
         # Step 5: Roadmap Generation (Uses the output of Step 4)
         # We pass the raw JSON string of concepts to the roadmap generator
-        roadmap_json = generate_roadmap.execute(self.client, concepts_json)
+        roadmap_json = self._run_skill(generate_roadmap, concepts_json)
         
         # Step 6: Summary Generation
-        summary_text = create_summary.execute(self.client, text)
+        summary_text = self._run_skill(create_summary, text)
 
         # Step 7: Visualization
         visualization_result = visualize_concepts.execute(concepts_json)
@@ -32,6 +67,31 @@ class Orchestrator:
             "visualization": visualization_result
         }
 
+    def precompute(self, text, is_cancelled=None):
+        """
+        Speculatively runs the model-backed steps of the study pack so that
+        a later generate_study_pack call is served from the result cache.
+        Args:
+            is_cancelled (callable): Checked between steps; returning True stops early.
+        Returns: dict with the names of the completed steps.
+        """
+        completed = []
+        is_cancelled = is_cancelled or (lambda: False)
+
+        concepts_json = self._run_skill(extract_concepts, text)
+        completed.append("concepts")
+        if is_cancelled():
+            return {"completed": completed, "cancelled": True}
+
+        self._run_skill(create_summary, text)
+        completed.append("summary")
+        if is_cancelled():
+            return {"completed": completed, "cancelled": True}
+
+        self._run_skill(generate_roadmap, concepts_json)
+        completed.append("roadmap")
+        return {"completed": completed, "cancelled": False}
+
     def handle_request(self, task_type, text):
         """
         Routes the request to the appropriate skill.
@@ -41,14 +101,16 @@ class Orchestrator:
 
         if task_type == "Generate Study Pack":
              return self.generate_study_pack(text)
+        elif task_type == "Precompute":
+            return self.precompute(text)
         elif task_type == "Extract Concepts":
-            return extract_concepts.execute(self.client, text)
+            return self._run_skill(extract_concepts, text)
         elif task_type == "Generate Roadmap":
             # Note: This fallback might be less accurate without the concept step, 
             # but we'll keep it for direct access if needed.
             return generate_roadmap.execute(self.client, text)
         elif task_type == "Create Summary":
-            return create_summary.execute(self.client, text)
+            return self._run_skill(create_summary, text)
         elif task_type == "Visual Summary":
             # Chain: Extract Concepts -> Visualize
             # First, we need the structured concepts
@@ -1,8 +1,12 @@
-def execute(client, text):
+# Key every valid response contains; used to tell real output from errors
+RESULT_KEY = "summary"
+
+
+def build_prompt(text):
     """
-    Creates a concise summary of the text.
+    Builds the summary prompt for the given text.
     """
-    prompt = f"""
+    return f"""
 You are a JSON generator. Summarize the text below into valid JSON.
 
 Text:
@@ -24,7 +28,14 @@ Rules:
   ]
 }}
 """
-    response = client.generate_text(prompt)
+
+
+def execute(client, text):
+    """
+    Creates a concise summary of the text.
+    """
+    prompt = build_prompt(text)
+    response = client.generate_text(prompt, skill="create_summary")
     
     # Use the centralized JSON cleaner for consistency
     from utils.json_cleaner import clean_json_string
@@ -1,10 +1,13 @@
-def execute(client, text):
+# Key every valid response contains; used to tell real output from errors
+RESULT_KEY = "extracted_concepts"
+
+
+def build_prompt(text):
     """
-    Extracts key concepts from the text.
-    Returns: JSON string with keys 'concepts' (list) and 'difficulty' (string).
+    Builds the concept-extraction prompt for the given text.
     """
     # Using double braces for the JSON schema so Python f-string doesn't crash
-    prompt = f"""
+    return f"""
 You are a JSON generator. Extract concepts from the text below into valid JSON.
 
 Text:
@@ -37,7 +40,15 @@ Rules:
 }}
 """
 
-    response = client.generate_text(prompt)
+
+def execute(client, text):
+    """
+    Extracts key concepts from the text.
+    Returns: JSON string with keys 'concepts' (list) and 'difficulty' (string).
+    """
+    prompt = build_prompt(text)
+
+    response = client.generate_text(prompt, skill="extract_concepts")
     
     # Use the centralized JSON cleaner for consistency
     from utils.json_cleaner import clean_json_string
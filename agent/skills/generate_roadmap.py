@@ -1,11 +1,12 @@
-def execute(client, concepts_data):
+# Key every valid response contains; used to tell real output from errors
+RESULT_KEY = "day1"
+
+
+def build_prompt(concepts_data):
     """
-    Generates a study roadmap based on extracted concepts.
-    Args:
-        concepts_data (str or dict): The output from the extract_concepts skill.
-    Returns: JSON string with a 7-day study plan.
+    Builds the roadmap prompt for the given concepts.
     """
-    prompt = f"""
+    return f"""
 You are a JSON generator. Your ONLY task is to output valid JSON for a 7-day study roadmap based on the concepts below.
 
 Concepts:
@@ -28,7 +29,17 @@ Rules:
     "day7": {{"topic": "Review", "activities": "Review all topics", "time_estimate": "2 hours"}}
 }}
 """
-    response = client.generate_text(prompt)
+
+
+def execute(client, concepts_data):
+    """
+    Generates a study roadmap based on extracted concepts.
+    Args:
+        concepts_data (str or dict): The output from the extract_concepts skill.
+    Returns: JSON string with a 7-day study plan.
+    """
+    prompt = build_prompt(concepts_data)
+    response = client.generate_text(prompt, skill="generate_roadmap")
     
     # Use the centralized JSON cleaner for consistency
     from utils.json_cleaner import clean_json_string
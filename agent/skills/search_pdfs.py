@@ -1,5 +1,12 @@
 import os
 import json
+import zlib
+import base64
+import fnmatch
+import hashlib
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 TOOL_SCHEMA = {
     "name": "search_study_pdfs",
@@ -14,37 +21,265 @@ TOOL_SCHEMA = {
             "root_directory": {
                 "type": "string",
                 "description": "The root directory to search. Defaults to current directory."
+            },
+            "exclude": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Glob patterns for directories or files to skip, matched against the name and the path relative to the root. Added to the built-in excludes (.git, __pycache__, node_modules, .venv, venv). A single string is treated as one pattern."
+            },
+            "max_depth": {
+                "type": "integer",
+                "minimum": 0,
+                "description": "How many directory levels below the root to search. Unlimited if omitted."
+            },
+            "limit": {
+                "type": "integer",
+                "default": 100,
+                "minimum": 1,
+                "description": "Maximum number of files to return."
+            },
+            "cursor": {
+                "type": "string",
+                "description": "'next_cursor' of the previous page, to continue the scan where it stopped. Pass the same other arguments."
+            },
+            "use_snapshot": {
+                "type": "boolean",
+                "default": False,
+                "description": "Reuse a cached listing of the tree and only re-read directories that changed."
             }
         }
     }
 }
 
-def execute(query=None, root_directory="."):
+# Directories that never contain study material but can be huge
+DEFAULT_EXCLUDES = [".git", "__pycache__", "node_modules", ".venv", "venv"]
+
+# Listing directories is I/O bound, so on network shares many threads help
+MAX_WORKERS = int(os.getenv("PDF_SCAN_WORKERS", "16"))
+SNAPSHOT_DIR = os.getenv("PDF_SCAN_SNAPSHOT_DIR", os.path.join("spool", "pdf_scan"))
+
+
+class DirectorySnapshot:
+    """
+    Cached listing of a directory tree, stored as JSON.
+    A directory is only listed again when its modification time changes,
+    which happens whenever an entry is added, removed or renamed in it.
+    """
+
+    def __init__(self, root_directory):
+        root_hash = hashlib.sha256(os.path.abspath(root_directory).encode("utf-8")).hexdigest()
+        self.path = os.path.join(SNAPSHOT_DIR, f"{root_hash[:16]}.json")
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+        self.visited = {}
+
+    def list_dir(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        entry = self.entries.get(path)
+        if entry is None or entry["mtime"] != mtime:
+            files, dirs = _list_dir(path)
+            entry = {"mtime": mtime, "files": files, "dirs": dirs}
+        self.visited[path] = entry
+        return entry["files"], entry["dirs"]
+
+    def save(self, complete):
+        """
+        Writes the snapshot. After a complete scan, directories that were
+        not seen any more are dropped.
+        """
+        if complete:
+            self.entries = self.visited
+        else:
+            self.entries.update(self.visited)
+
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+
+def _list_dir(path):
+    """
+    Lists one directory.
+    Returns: (sorted PDF file names, sorted subdirectory names).
+    """
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    # Symlinked directories are not followed to avoid cycles
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.name)
+                    elif entry.name.lower().endswith(".pdf"):
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        # Unreadable or vanished directories are skipped, like os.walk does
+        pass
+    return sorted(files), sorted(dirs)
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _excluded(name, rel_path, patterns):
+    return any(
+        fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern)
+        for pattern in patterns
+    )
+
+
+class PdfScan:
+    """
+    Breadth-first scan for PDF files whose position can be saved as a cursor.
+    Directories are listed in parallel on a thread pool; closing the
+    iteration early cancels the remaining work.
+    """
+
+    def __init__(self, query=None, root_directory=".", exclude=None, max_depth=None, snapshot=None, cursor=None):
+        self.root_directory = root_directory
+        self.query = query.lower() if query else None
+        self.patterns = DEFAULT_EXCLUDES + list(exclude or [])
+        self.max_depth = max_depth
+        self.list_dir = snapshot.list_dir if snapshot else _list_dir
+
+        # Directories still to list and listings in flight, both in BFS order
+        self.pending = deque([(root_directory, 0)])
+        self.in_flight = deque()
+        # Matches already returned from the first directory of a resumed scan
+        self.skip = 0
+        if cursor:
+            state = json.loads(zlib.decompress(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+            self.pending = deque((path, depth) for path, depth in state["pending"])
+            self.skip = state["skip"]
+            # Cursors come back from the caller, so check their shape here
+            # rather than failing halfway through the scan
+            if not _is_count(self.skip) or not all(
+                isinstance(path, str) and _is_count(depth) for path, depth in self.pending
+            ):
+                raise ValueError("Malformed cursor state.")
+
+        self._current = None
+
+    def cursor(self):
+        """
+        Encodes the position of the match yielded last, so that a new scan
+        resumes with that match. The frontier holds directories, not files,
+        so a cursor stays small compared to the tree.
+        """
+        path, depth, matched = self._current
+        frontier = [[path, depth]]
+        frontier += [[p, d] for p, d, _ in self.in_flight]
+        frontier += [[p, d] for p, d in self.pending]
+        state = json.dumps({"pending": frontier, "skip": matched}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(zlib.compress(state.encode("utf-8"))).decode("ascii")
+
+    def __iter__(self):
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        skip = self.skip
+        try:
+            while self.pending or self.in_flight:
+                # Keep the pool busy without queueing the whole tree at once
+                while self.pending and len(self.in_flight) < MAX_WORKERS * 4:
+                    path, depth = self.pending.popleft()
+                    self.in_flight.append((path, depth, executor.submit(self.list_dir, path)))
+
+                path, depth, future = self.in_flight.popleft()
+                files, dirs = future.result()
+
+                matched = 0
+                for name in files:
+                    full_path = os.path.join(path, name)
+                    if self.query and self.query not in name.lower():
+                        continue
+                    if _excluded(name, os.path.relpath(full_path, self.root_directory), self.patterns):
+                        continue
+                    matched += 1
+                    if matched <= skip:
+                        continue
+                    self._current = (path, depth, matched - 1)
+                    yield {"filename": name, "path": full_path, "directory": path}
+                skip = 0
+
+                if self.max_depth is not None and depth >= self.max_depth:
+                    continue
+                for name in dirs:
+                    full_path = os.path.join(path, name)
+                    if not _excluded(name, os.path.relpath(full_path, self.root_directory), self.patterns):
+                        self.pending.append((full_path, depth + 1))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdfs(query=None, root_directory=".", exclude=None, max_depth=None, snapshot=None):
+    """
+    Yields matching PDF files one by one, in a stable breadth-first order.
+    """
+    return iter(PdfScan(query, root_directory, exclude, max_depth, snapshot))
+
+
+def execute(query=None, root_directory=".", exclude=None, max_depth=None, limit=100, cursor=None, use_snapshot=False):
     """
     Searches for PDF files in the specified directory recursively.
+    Results are paginated: pass the returned 'next_cursor' to get the next page.
     """
+    if not _is_count(limit) or limit < 1:
+        return json.dumps({"status": "error", "message": "limit must be a positive integer."})
+    if max_depth is not None and not _is_count(max_depth):
+        return json.dumps({"status": "error", "message": "max_depth must be a non-negative integer."})
+    if isinstance(exclude, str):
+        # A single pattern is a common shorthand for a one-item list
+        exclude = [exclude]
+    if exclude is not None and not (
+        isinstance(exclude, list) and all(isinstance(pattern, str) for pattern in exclude)
+    ):
+        return json.dumps({"status": "error", "message": "exclude must be a list of glob patterns."})
+
+    snapshot = DirectorySnapshot(root_directory) if use_snapshot else None
+    try:
+        scan = PdfScan(query, root_directory, exclude, max_depth, snapshot, cursor)
+    except (ValueError, KeyError, TypeError, zlib.error):
+        return json.dumps({"status": "error", "message": "Invalid cursor."})
+
     pdf_files = []
-    
-    # Walk through the directory
-    for root, dirs, files in os.walk(root_directory):
-        for file in files:
-            if file.lower().endswith(".pdf"):
-                # If a query is provided, check if it matches the filename
-                if query and query.lower() not in file.lower():
-                    continue
-                
-                full_path = os.path.join(root, file)
-                pdf_files.append({
-                    "filename": file,
-                    "path": full_path,
-                    "directory": root
-                })
-    
+    next_cursor = None
+    matches = iter(scan)
+    for pdf in matches:
+        if len(pdf_files) == limit:
+            # One extra match tells us whether another page exists
+            next_cursor = scan.cursor()
+            break
+        pdf_files.append(pdf)
+    matches.close()
+
+    if snapshot:
+        # Only an unfiltered scan of the whole tree shows which cached
+        # directories are gone; any other scan just adds to the snapshot.
+        full_scan = next_cursor is None and cursor is None and max_depth is None and not exclude
+        snapshot.save(complete=full_scan)
+
     if not pdf_files:
         return json.dumps({"status": "no_results", "message": "No PDFs found."})
-        
+
     return json.dumps({
         "status": "success",
         "count": len(pdf_files),
+        "next_cursor": next_cursor,
         "files": pdf_files
-    }, indent=2)
+    })
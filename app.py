@@ -1,13 +1,35 @@
 import streamlit as st
-from agent.orchestrator import Orchestrator
+from agent.job_queue import JobQueue, start_workers, STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED
 from utils.file_parser import parse_file
-from utils.json_cleaner import clean_json_string
+from utils.study_pack_export import parse_study_pack, pack_difficulty, concept_rows, roadmap_rows, export_pack
 import os
-import json
+import time
+import uuid
+import base64
+import hashlib
 
 # Page config
 st.set_page_config(page_title="AI Academic Agent", layout="wide")
 
+# Worker processes started alongside the app. Set to 0 when workers run
+# separately (python -m agent.job_queue) against a shared JOB_QUEUE_PATH.
+LOCAL_WORKERS = int(os.getenv("JOB_QUEUE_LOCAL_WORKERS", "2"))
+
+# Speculative analysis runs below normal jobs and is capped per user,
+# since most of its work is thrown away when the user never clicks Analyze.
+SPECULATIVE_PRIORITY = -10
+SPECULATIVE_BUDGET_PER_HOUR = int(os.getenv("SPECULATIVE_BUDGET_PER_HOUR", "5"))
+
+@st.cache_resource
+def get_job_queue():
+    """
+    Opens the job spool once per server and starts the local workers.
+    """
+    queue = JobQueue()
+    if LOCAL_WORKERS > 0:
+        start_workers(LOCAL_WORKERS, queue.db_path)
+    return queue
+
 def main():
     st.title("🎓 AI Academic Agent")
     st.markdown("### From Lecture Notes to Study Plan in Seconds")
@@ -15,16 +37,27 @@ def main():
     # Sidebar for setup
     with st.sidebar:
         st.header("Configuration")
-        api_key = st.text_input("Watsonx API Key (Optional if set in .env)", type="password")
-        project_id = st.text_input("Project ID (Optional if set in .env)", type="password")
-        
-        if api_key:
-            os.environ["WATSONX_API_KEY"] = api_key
-        if project_id:
-            os.environ["WATSONX_PROJECT_ID"] = project_id
+        # Workers run in separate processes, possibly on other machines, so
+        # credentials cannot be entered here; each worker reads its own .env.
+        st.caption("Watsonx credentials are read by the workers from `.env`.")
+
+        speculative = st.checkbox(
+            "Start analysis on upload",
+            help="Begins extracting concepts and summarizing as soon as the file is read, "
+                 "so the study pack is usually ready when you click Analyze."
+        )
 
-    # Initialize Orchestrator
-    orchestrator = Orchestrator()
+    job_queue = get_job_queue()
+
+    # Kept in the URL next to the job id, so that reloading the page keeps
+    # the same identity for fairness and the speculative budget
+    if not st.query_params.get("user"):
+        st.query_params["user"] = uuid.uuid4().hex
+    st.session_state.user_id = st.query_params["user"]
+
+    # A job id in the URL lets the user reload the page and pick up
+    # a study pack that was still being generated.
+    job_id = st.query_params.get("job")
 
     # STEP 1: UPLOAD
     uploaded_file = st.file_uploader("Step 1: Upload your lecture notes (PDF/TXT)", type=["pdf", "txt"])
@@ -38,98 +71,126 @@ def main():
             with st.expander("View extracted text"):
                 st.text_area("Raw Text", text_content, height=150)
 
+        if speculative and not text_content.startswith(("Error reading file", "Unsupported file type")):
+            start_speculative_job(job_queue, text_content)
+        else:
+            cancel_speculative_job(job_queue)
+
         st.divider()
 
         # STEP 3: AGENT INITIALIZATION & EXECUTION
         if st.button("🚀 Analyze & Generate Study Pack", type="primary"):
-            
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            try:
-                # We can simulate progress updates or just run the batch
-                status_text.text("Agent Initialized: Analyzing content...")
-                progress_bar.progress(10)
-                
-                # The Orchestrator handles Steps 4, 5, and 6 internally
-                results = orchestrator.handle_request("Generate Study Pack", text_content)
-                
-                progress_bar.progress(100)
-                status_text.text("Analysis Complete!")
-                
-                # STEP 7: OUTPUT DELIVERY
-                display_results(results)
-
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
+            # A speculative job that has not started yet would only repeat this
+            # work. One that is already running is waited for, so the study
+            # pack is then assembled from the result cache it fills.
+            depends_on = None
+            speculative_job = st.session_state.get("speculative_job")
+            if speculative_job:
+                status = job_queue.status(speculative_job)
+                # A job that lost its lease is queued again but keeps started_at,
+                # so branch on the status itself
+                if status and status["status"] == STATUS_QUEUED:
+                    job_queue.cancel(speculative_job)
+                elif status and status["status"] == STATUS_RUNNING:
+                    depends_on = speculative_job
+
+            job_id = job_queue.enqueue(
+                text_content, user_id=st.session_state.user_id, depends_on=depends_on
+            )
+            st.query_params["job"] = job_id
+    else:
+        cancel_speculative_job(job_queue)
+
+    if job_id:
+        wait_for_job(job_queue, job_id)
+
+def start_speculative_job(job_queue, text_content):
+    """
+    Queues a background analysis of a new upload, filling the result cache.
+    Replaces the speculative job of a previous upload.
+    """
+    text_hash = hashlib.sha256(text_content.encode("utf-8")).hexdigest()
+    if st.session_state.get("speculative_hash") == text_hash:
+        return
+
+    cancel_speculative_job(job_queue)
+    st.session_state.speculative_hash = text_hash
+
+    user_id = st.session_state.user_id
+    if job_queue.count_recent(user_id, "Precompute", time.time() - 3600) >= SPECULATIVE_BUDGET_PER_HOUR:
+        st.caption("Background analysis limit reached; the study pack will start when you click Analyze.")
+        return
+
+    st.session_state.speculative_job = job_queue.enqueue(
+        text_content, user_id=user_id, priority=SPECULATIVE_PRIORITY, task="Precompute"
+    )
+
+def cancel_speculative_job(job_queue):
+    """
+    Stops the background analysis of the previous upload, if any.
+    """
+    speculative_job = st.session_state.pop("speculative_job", None)
+    st.session_state.pop("speculative_hash", None)
+    if speculative_job:
+        job_queue.cancel(speculative_job)
+
+def wait_for_job(job_queue, job_id, poll_interval=1.0):
+    """
+    Polls a queued study-pack job and renders it once it is done.
+    """
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    while True:
+        job = job_queue.status(job_id)
+
+        if job is None:
+            status_text.empty()
+            st.error(f"Unknown job: {job_id}")
+            return
+        if job["status"] == STATUS_FAILED:
+            status_text.empty()
+            st.error(f"An error occurred: {job['error']}")
+            return
+        if job["status"] == STATUS_CANCELLED:
+            status_text.empty()
+            st.warning("This job was cancelled.")
+            return
+        if job["status"] == STATUS_DONE:
+            break
+
+        if job["started_at"]:
+            status_text.text("Agent Initialized: Analyzing content...")
+            progress_bar.progress(50)
+        else:
+            status_text.text("Waiting for a free worker...")
+            progress_bar.progress(10)
+        time.sleep(poll_interval)
+
+    progress_bar.progress(100)
+    status_text.text("Analysis Complete!")
+
+    # STEP 7: OUTPUT DELIVERY
+    display_results(job_queue.result(job_id))
 
 def display_results(results):
     """
     Renders the study pack components.
+    Lists are drawn as single tables so large packs stay fast to render.
     """
-    
+    pack = parse_study_pack(results)
+
     # 1. Key Concepts
     st.header("1. Key Concepts (Skill 1)")
     concepts_raw = results.get("concepts", "")
     
     if concepts_raw.startswith("Error"):
         st.error(concepts_raw)
+    elif pack["concepts"] is None:
+        st.warning("Could not parse Concepts JSON. Raw output:")
+        st.code(concepts_raw)
     else:
-        try:
-            cleaned_concepts = clean_json_string(concepts_raw)
-            concepts_data = json.loads(cleaned_concepts)
-            
-            # Helper to safely get data whether it's nested under "document_metadata" or flat
-            # The schema defines "document_metadata" and "extracted_concepts"
-            if "document_metadata" in concepts_data:
-                difficulty = concepts_data["document_metadata"].get("difficulty_level", "Unknown")
-            else:
-                difficulty = concepts_data.get("difficulty", "Unknown")
-                
-            st.info(f"**Difficulty Level:** {difficulty}")
-            
-            # Handle different potential structures for list of concepts
-            concepts_list = concepts_data.get("extracted_concepts", concepts_data.get("concepts", []))
-            
-            if concepts_list:
-                for concept in concepts_list:
-                    with st.container():
-                        st.subheader(f"📌 {concept.get('concept_name', 'Concept')}")
-                        
-                        col1, col2 = st.columns([2, 1])
-                        
-                        with col1:
-                            st.markdown(f"**Definition:**  \n{concept.get('definition', 'N/A')}")
-                            st.markdown(f"**Problem Solved:**  \n{concept.get('problem_solved', 'N/A')}")
-                        
-                        with col2:
-                            # Mathematical Formula
-                            formula = concept.get("mathematical_formula")
-                            if formula:
-                                st.markdown("**Formula:**")
-                                st.latex(formula)
-                            
-                            # Code Implementation
-                            code = concept.get("code_implementation")
-                            if code:
-                                lib = code.get('library', 'Unknown Lib')
-                                func = code.get('class_function', 'Unknown Func')
-                                st.markdown(f"**Implementation:** `{lib}.{func}`")
-
-                        # Limitations
-                        limitations = concept.get("limitations")
-                        if limitations:
-                            st.markdown("**Limitations:**")
-                            for lim in limitations:
-                                st.markdown(f"- {lim}")
-                        
-                        st.divider()
-            else:
-                st.write("No specific concepts structured.")
-                st.code(concepts_raw) # Fallback
-        except json.JSONDecodeError:
-            st.warning("Could not parse Concepts JSON. Raw output:")
-            st.code(concepts_raw)
+        render_concepts(pack)
 
     st.divider()
 
@@ -139,67 +200,34 @@ def display_results(results):
     
     if roadmap_raw.startswith("Error"):
         st.error(roadmap_raw)
+    elif pack["roadmap"] is None:
+        st.warning("Could not parse Roadmap JSON. Raw output:")
+        st.code(roadmap_raw)
     else:
-        try:
-            cleaned_roadmap = clean_json_string(roadmap_raw)
-            roadmap_data = json.loads(cleaned_roadmap)
-            
-            # Display as a timeline or formatted list
-            for day, details in roadmap_data.items():
-                with st.container():
-                    # Handle if details is a string (rare but possible with some models) or dict
-                    if isinstance(details, dict):
-                        st.subheader(f"📅 {day.capitalize()}: {details.get('topic', 'Topic')}")
-                        st.write(f"**Activities:** {details.get('activities', '')}")
-                        st.caption(f"⏱️ Time Estimate: {details.get('time_estimate', '')}")
-                    else:
-                        st.subheader(f"📅 {day.capitalize()}")
-                        st.write(str(details))
-                        
-        except json.JSONDecodeError:
-            st.warning("Could not parse Roadmap JSON. Raw output:")
-            st.code(roadmap_raw)
+        st.dataframe(list(roadmap_rows(pack)), hide_index=True, use_container_width=True)
 
     st.divider()
 
     # 3. Summary
     st.header("3. Summary (Skill 3)")
     summary_raw = results.get("summary", "")
+    summary_data = pack["summary"]
     
     if summary_raw.startswith("Error"):
          st.error(summary_raw)
+    elif summary_data is None:
+        st.warning("Could not parse Summary JSON. Raw output:")
+        st.markdown(summary_raw)
     else:
-        try:
-            cleaned_summary = clean_json_string(summary_raw)
-            summary_data = json.loads(cleaned_summary)
-            
-            st.subheader(summary_data.get("title", "Summary"))
-            st.write(summary_data.get("summary", ""))
-            
-            steps = summary_data.get("steps", [])
-            if steps:
-                st.write("**Key Steps:**")
-                for step in steps:
-                    st.write(f"- {step}")
-            
-            # Prepare text for download
-            download_text = f"# {summary_data.get('title', 'Summary')}\n\n"
-            download_text += f"{summary_data.get('summary', '')}\n\n"
-            if steps:
-                download_text += "## Steps\n" + "\n".join([f"- {s}" for s in steps])
-                
-        except json.JSONDecodeError:
-            st.warning("Could not parse Summary JSON. Raw output:")
-            st.markdown(summary_raw)
-            download_text = summary_raw
-
-    # Download Button
-    st.download_button(
-        label="📥 Download Summary (.md)",
-        data=download_text,
-        file_name="study_summary.md",
-        mime="text/markdown"
-    )
+        st.subheader(summary_data.get("title", "Summary"))
+        st.write(summary_data.get("summary", ""))
+        
+        steps = summary_data.get("steps", [])
+        if steps:
+            st.markdown("**Key Steps:**\n" + "\n".join(f"- {step}" for step in steps))
+
+    # Download Buttons
+    render_downloads(pack)
 
     st.divider()
 
@@ -208,22 +236,75 @@ def display_results(results):
     visualization_raw = results.get("visualization", "")
     
     if "successfully" in visualization_raw:
-        # Extract path from message: "Visualization generated successfully: path/to/file.png"
-        image_path = visualization_raw.split(": ")[1].strip()
-        if os.path.exists(image_path):
-            st.image(image_path, caption="Concept Map", use_container_width=True)
+        # Workers embed the PNG in the job result; the path in the message
+        # only exists on the worker's machine.
+        image_data = results.get("visualization_png")
+        if image_data:
+            image_bytes = base64.b64decode(image_data)
+            st.image(image_bytes, caption="Concept Map", use_container_width=True)
             
-            with open(image_path, "rb") as file:
-                btn = st.download_button(
-                        label="📥 Download Concept Map",
-                        data=file,
-                        file_name="concept_map.png",
-                        mime="image/png"
-                    )
+            st.download_button(
+                label="📥 Download Concept Map",
+                data=image_bytes,
+                file_name="concept_map.png",
+                mime="image/png"
+            )
         else:
-             st.error(f"Image file not found at: {image_path}")
+            image_path = visualization_raw.split(": ", 1)[1].strip()
+            st.error(f"Image file not found at: {image_path}")
     else:
         st.warning(visualization_raw)
 
+def render_concepts(pack):
+    """
+    Draws all concepts as one table instead of a set of widgets per concept.
+    """
+    rows = list(concept_rows(pack))
+    st.info(f"**Difficulty Level:** {pack_difficulty(pack) or 'Unknown'}")
+
+    if not rows:
+        st.write("No specific concepts structured.")
+        st.code(pack["raw"].get("concepts", "")) # Fallback
+        return
+
+    columns = [
+        "concept_name", "definition", "problem_solved",
+        "mathematical_formula", "library", "class_function", "limitations"
+    ]
+    st.dataframe(
+        [{column: row[column] for column in columns} for row in rows],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "concept_name": "Concept",
+            "definition": "Definition",
+            "problem_solved": "Problem Solved",
+            "mathematical_formula": "Formula",
+            "library": "Library",
+            "class_function": "Class / Function",
+            "limitations": "Limitations"
+        }
+    )
+
+def render_downloads(pack):
+    """
+    Offers the whole study pack in every export format.
+    """
+    downloads = [
+        ("📥 Download Study Pack (.md)", "markdown", "study_pack.md", "text/markdown"),
+        ("📥 Download Concepts (.csv)", "csv", "concepts.csv", "text/csv"),
+        ("📥 Download Flashcards (Anki)", "anki", "flashcards.txt", "text/plain"),
+        ("📥 Download Study Pack (.jsonl)", "jsonl", "study_pack.jsonl", "application/jsonl")
+    ]
+    exports = export_pack(pack)
+    for column, (label, fmt, file_name, mime) in zip(st.columns(len(downloads)), downloads):
+        with column:
+            st.download_button(
+                label=label,
+                data=exports[fmt],
+                file_name=file_name,
+                mime=mime
+            )
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import contextlib
+
+# Shared by all workers, so a document uploaded by many students is only
+# analyzed once. Lives next to the job spool by default.
+DEFAULT_DB_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join("spool", "results.db"))
+
+# Cached results are deleted after this long, like finished jobs in the spool
+RETENTION_SECONDS = int(os.getenv("RESULT_CACHE_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+
+def cache_key(stage, prompt, model_id, params):
+    """
+    Content address of a skill result.
+    Changing the prompt, model or decoding parameters invalidates it.
+    """
+    request = json.dumps(
+        {"stage": stage, "model_id": model_id, "params": params, "prompt": prompt},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Persistent cache of skill outputs, backed by SQLite.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or DEFAULT_DB_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, stage TEXT NOT NULL, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, stage, prompt, model_id, params):
+        """
+        Returns the cached output, or None on a miss.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM results WHERE key = ?",
+                (cache_key(stage, prompt, model_id, params),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, stage, prompt, model_id, params, value):
+        """
+        Stores a skill output.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, stage, value, created_at) VALUES (?, ?, ?, ?)",
+                (cache_key(stage, prompt, model_id, params), stage, value, time.time())
+            )
+
+    def purge(self, older_than=None):
+        """
+        Deletes results stored more than older_than seconds ago.
+        Returns: number of deleted results.
+        """
+        older_than = RETENTION_SECONDS if older_than is None else older_than
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM results WHERE created_at < ?",
+                (time.time() - older_than,)
+            )
+        return cursor.rowcount
@@ -0,0 +1,185 @@
+import os
+import sys
+import glob
+import gzip
+import json
+import socket
+import hashlib
+import argparse
+import tempfile
+
+SNAPSHOT_VERSION = 1
+
+# Placeholder used to split a skill's prompt into its fixed prefix and suffix
+INPUT_MARKER = "\x00SNAPSHOT_INPUT\x00"
+
+# Snapshots recorded without a skill name (e.g. direct client calls)
+UNKNOWN_SKILL = "unknown"
+
+
+def snapshot_key(prompt, model_id, params):
+    """
+    Content address of a generation request.
+    Any change to the prompt, model or decoding parameters gives a new key.
+    """
+    request = json.dumps(
+        {"model_id": model_id, "params": params, "prompt": prompt},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class SnapshotStore:
+    """
+    Compressed, content-addressed store of prompt -> response pairs.
+    Everything is loaded into memory so replays never touch the network.
+
+    The snapshot is a compacted main file plus one append-only shard per
+    recording process, so concurrent workers never rewrite each other's
+    entries and recording a response costs a single small append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.shard_path = f"{path}.{socket.gethostname()}-{os.getpid()}.part"
+        self.entries = self._read()
+
+    def _shards(self):
+        return sorted(glob.glob(glob.escape(self.path) + ".*.part"))
+
+    def _read(self):
+        entries = {}
+        if os.path.exists(self.path):
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                entries.update(json.load(f).get("entries", {}))
+
+        for shard in self._shards():
+            try:
+                # Each append is its own gzip member; gzip reads them as one stream
+                with gzip.open(shard, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        entries[record.pop("key")] = record
+            except (OSError, EOFError, ValueError):
+                # A recorder killed mid-write leaves a truncated last record
+                continue
+        return entries
+
+    def get(self, prompt, model_id, params):
+        """
+        Returns the recorded response, or None if this request was never recorded.
+        """
+        entry = self.entries.get(snapshot_key(prompt, model_id, params))
+        return entry["response"] if entry else None
+
+    def put(self, prompt, model_id, params, response, skill=None):
+        """
+        Records a response by appending it to this process's shard.
+        """
+        key = snapshot_key(prompt, model_id, params)
+        entry = {
+            "skill": skill or UNKNOWN_SKILL,
+            "model_id": model_id,
+            "params": params,
+            "prompt": prompt,
+            "response": response
+        }
+        self.entries[key] = entry
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(self.shard_path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(dict(entry, key=key), default=str, separators=(",", ":")) + "\n")
+
+    def compact(self):
+        """
+        Merges all shards into the main file and removes them.
+        Run it while nothing is recording, or entries appended meanwhile are lost.
+        """
+        shards = self._shards()
+        self.entries = self._read()
+
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(
+                    {"version": SNAPSHOT_VERSION, "entries": self.entries},
+                    f, sort_keys=True, default=str, separators=(",", ":")
+                )
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        for shard in shards:
+            os.remove(shard)
+
+
+def _skill_templates():
+    """
+    Returns {skill_name: (prefix, suffix)} for every skill that prompts the model.
+    """
+    from agent.skills import extract_concepts, generate_roadmap, create_summary
+
+    templates = {}
+    for skill in (extract_concepts, generate_roadmap, create_summary):
+        name = skill.__name__.rsplit(".", 1)[-1]
+        prefix, suffix = skill.build_prompt(INPUT_MARKER).split(INPUT_MARKER)
+        templates[name] = (prefix, suffix)
+    return templates
+
+
+def diff(path, model_id, params):
+    """
+    Checks a snapshot file against the current skill prompts and client settings.
+    Returns: dict mapping skill name to a list of invalidated snapshot keys.
+    """
+    store = SnapshotStore(path)
+    templates = _skill_templates()
+    invalidated = {name: [] for name in templates}
+
+    for key, entry in store.entries.items():
+        skill = entry.get("skill", UNKNOWN_SKILL)
+        prompt = entry["prompt"]
+
+        if skill not in templates:
+            # No current template to compare with, so it cannot be verified
+            invalidated.setdefault(skill, []).append(key)
+            continue
+
+        prefix, suffix = templates[skill]
+        prompt_changed = not (prompt.startswith(prefix) and prompt.endswith(suffix))
+        settings_changed = snapshot_key(prompt, model_id, params) != key
+        if prompt_changed or settings_changed:
+            invalidated[skill].append(key)
+
+    return invalidated
+
+
+if __name__ == "__main__":
+    from utils.watsonx_client import WatsonxClient, DEFAULT_SNAPSHOT_PATH
+
+    parser = argparse.ArgumentParser(description="Check or compact a Watsonx snapshot file.")
+    parser.add_argument("path", nargs="?", default=DEFAULT_SNAPSHOT_PATH)
+    parser.add_argument("--compact", action="store_true", help="Merge recording shards into the main file.")
+    args = parser.parse_args()
+
+    if args.compact:
+        SnapshotStore(args.path).compact()
+        print(f"Compacted {args.path}")
+        sys.exit(0)
+
+    client = WatsonxClient()
+    results = diff(args.path, client.model_id, client.params)
+
+    stale = 0
+    for skill, keys in results.items():
+        if keys:
+            print(f"{skill}: {len(keys)} snapshot(s) no longer match the current prompt or model settings")
+            stale += len(keys)
+    if not stale:
+        print(f"All snapshots in {args.path} are up to date.")
+    sys.exit(1 if stale else 0)
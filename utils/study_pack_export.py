@@ -0,0 +1,238 @@
+import io
+import csv
+import html
+import json
+from utils.json_cleaner import clean_json_string
+
+CSV_FIELDS = [
+    "topic",
+    "difficulty_level",
+    "concept_name",
+    "definition",
+    "problem_solved",
+    "mathematical_formula",
+    "library",
+    "class_function",
+    "limitations"
+]
+
+
+def _load(raw):
+    """
+    Parses one skill output into a dict, or returns None if it is not valid JSON.
+    """
+    if isinstance(raw, dict):
+        return raw
+    if not raw or raw.startswith("Error"):
+        return None
+    try:
+        data = json.loads(clean_json_string(raw))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_study_pack(results):
+    """
+    Parses the raw output of Orchestrator.generate_study_pack.
+    Returns: dict with 'concepts', 'roadmap' and 'summary' (each a dict or None)
+    and the original 'raw' results.
+    """
+    return {
+        "concepts": _load(results.get("concepts", "")),
+        "roadmap": _load(results.get("roadmap", "")),
+        "summary": _load(results.get("summary", "")),
+        "raw": results
+    }
+
+
+def _dict(value):
+    return value if isinstance(value, dict) else {}
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def pack_difficulty(pack):
+    """
+    Returns the difficulty level of a parsed study pack, or "" if unknown.
+    """
+    concepts_data = pack["concepts"] or {}
+    metadata = _dict(concepts_data.get("document_metadata"))
+    return _text(metadata.get("difficulty_level", concepts_data.get("difficulty")))
+
+
+def concept_rows(pack):
+    """
+    Flattens the concepts of a parsed study pack into one dict per concept.
+    """
+    # Model output is only loosely shaped, so every field may be missing,
+    # null or of the wrong type.
+    concepts_data = pack["concepts"] or {}
+
+    # Same fallbacks as the UI: the model sometimes returns a flat structure
+    metadata = _dict(concepts_data.get("document_metadata"))
+    topic = _text(metadata.get("topic"))
+    difficulty = pack_difficulty(pack)
+    concepts_list = concepts_data.get("extracted_concepts", concepts_data.get("concepts"))
+    if not isinstance(concepts_list, list):
+        concepts_list = []
+
+    for concept in concepts_list:
+        if not isinstance(concept, dict):
+            continue
+        code = concept.get("code_implementation")
+        if isinstance(code, dict):
+            library = _text(code.get("library"))
+            class_function = _text(code.get("class_function"))
+        else:
+            # A plain string such as "sklearn.GridSearchCV"
+            library, class_function = "", _text(code)
+        formula = _text(concept.get("mathematical_formula"))
+        limitations = concept.get("limitations") or []
+        if not isinstance(limitations, list):
+            limitations = [limitations]
+        yield {
+            "topic": topic,
+            "difficulty_level": difficulty,
+            "concept_name": _text(concept.get("concept_name")),
+            "definition": _text(concept.get("definition")),
+            "problem_solved": _text(concept.get("problem_solved")),
+            "mathematical_formula": formula if formula != "null" else "",
+            "library": library,
+            "class_function": class_function,
+            "limitations": "; ".join(str(lim) for lim in limitations)
+        }
+
+
+def roadmap_rows(pack):
+    """
+    Flattens the roadmap of a parsed study pack into one dict per day.
+    """
+    for day, details in (pack["roadmap"] or {}).items():
+        if isinstance(details, dict):
+            yield {
+                "day": day.capitalize(),
+                "topic": _text(details.get("topic")),
+                "activities": _text(details.get("activities")),
+                "time_estimate": _text(details.get("time_estimate"))
+            }
+        else:
+            yield {"day": day.capitalize(), "topic": "", "activities": str(details), "time_estimate": ""}
+
+
+def _markdown(pack, rows):
+    summary = pack["summary"] or {}
+    title = summary.get("title") or (rows[0]["topic"] if rows else "") or "Study Pack"
+    parts = [f"# {title}\n\n"]
+
+    if summary.get("summary"):
+        parts.append(f"{summary['summary']}\n\n")
+    elif pack["summary"] is None:
+        # Keep unparseable summaries readable rather than dropping them
+        raw_summary = pack["raw"].get("summary", "")
+        if raw_summary and not raw_summary.startswith("Error"):
+            parts.append(f"{raw_summary}\n\n")
+    steps = summary.get("steps")
+    if isinstance(steps, list) and steps:
+        parts.append("## Steps\n" + "".join(f"- {s}\n" for s in steps) + "\n")
+
+    if rows:
+        parts.append("## Key Concepts\n\n")
+        for row in rows:
+            parts.append(f"### {row['concept_name']}\n\n**Definition:** {row['definition']}\n\n")
+            if row["problem_solved"]:
+                parts.append(f"**Problem Solved:** {row['problem_solved']}\n\n")
+            if row["mathematical_formula"]:
+                parts.append(f"$${row['mathematical_formula']}$$\n\n")
+            if row["library"] or row["class_function"]:
+                implementation = ".".join(part for part in (row["library"], row["class_function"]) if part)
+                parts.append(f"**Implementation:** `{implementation}`\n\n")
+            if row["limitations"]:
+                parts.append(f"**Limitations:** {row['limitations']}\n\n")
+
+    days = list(roadmap_rows(pack))
+    if days:
+        parts.append("## 7-Day Study Roadmap\n\n")
+        for day in days:
+            heading = f"{day['day']}: {day['topic']}" if day["topic"] else day["day"]
+            line = f"- **{heading}** - {day['activities']}"
+            if day["time_estimate"]:
+                line += f" ({day['time_estimate']})"
+            parts.append(line + "\n")
+        parts.append("\n")
+
+    return "".join(parts)
+
+
+def _anki_field(value):
+    # Fields are imported as HTML, and tabs and newlines act as separators
+    return html.escape(str(value)).replace("\t", " ").replace("\n", "<br>")
+
+
+def export_packs(packs, markdown=None, jsonl=None, csv_file=None, anki=None):
+    """
+    Writes a batch of study packs to every requested format in a single pass.
+    Args:
+        packs: Iterable of raw Orchestrator results or parsed study packs.
+        markdown, jsonl, csv_file, anki: Writable text streams; None skips the format.
+    Returns:
+        int: Number of packs exported.
+    """
+    csv_writer = None
+    if csv_file is not None:
+        csv_writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        csv_writer.writeheader()
+    if anki is not None:
+        # Header understood by Anki's "Import File" dialog
+        anki.write("#separator:tab\n#html:true\n#tags column:3\n")
+
+    count = 0
+    for pack in packs:
+        if "raw" not in pack:
+            pack = parse_study_pack(pack)
+        rows = list(concept_rows(pack))
+
+        if markdown is not None:
+            if count:
+                markdown.write("\n---\n\n")
+            markdown.write(_markdown(pack, rows))
+        if jsonl is not None:
+            record = {key: pack[key] for key in ("concepts", "roadmap", "summary")}
+            jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if csv_writer is not None:
+            csv_writer.writerows(rows)
+        if anki is not None:
+            for row in rows:
+                # Anki rejects cards with an empty front, and a card without
+                # a definition has nothing to learn from
+                if not row["concept_name"].strip() or not row["definition"].strip():
+                    continue
+                back = _anki_field(row["definition"])
+                if row["mathematical_formula"]:
+                    back += f"<br>\\({_anki_field(row['mathematical_formula'])}\\)"
+                tag = row["topic"].replace(" ", "_")
+                anki.write(f"{_anki_field(row['concept_name'])}\t{back}\t{_anki_field(tag)}\n")
+        count += 1
+
+    return count
+
+
+def export_pack(results, formats=("markdown", "jsonl", "csv", "anki")):
+    """
+    Exports a single study pack to strings, rendering all formats in one pass.
+    Args:
+        results: Raw Orchestrator result or a parsed study pack.
+        formats: Any of 'markdown', 'jsonl', 'csv' and 'anki'.
+    Returns:
+        dict: Format name -> exported text.
+    """
+    targets = {"markdown": "markdown", "jsonl": "jsonl", "csv": "csv_file", "anki": "anki"}
+    unknown = set(formats) - set(targets)
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(sorted(unknown))}")
+
+    buffers = {fmt: io.StringIO() for fmt in formats}
+    export_packs([results], **{targets[fmt]: buffer for fmt, buffer in buffers.items()})
+    return {fmt: buffer.getvalue() for fmt, buffer in buffers.items()}
@@ -3,9 +3,15 @@ from dotenv import load_dotenv
 from ibm_watsonx_ai.foundation_models import ModelInference
 from ibm_watsonx_ai.metanames import GenTextParamsMetaNames as GenParams
 from ibm_watsonx_ai.foundation_models.utils.enums import ModelTypes
+from utils.snapshot_store import SnapshotStore
 
 load_dotenv()
 
+# "live" calls the API, "record" also saves every response to the snapshot
+# file, "replay" serves responses from the snapshot file without any network.
+MODES = ("live", "record", "replay")
+DEFAULT_SNAPSHOT_PATH = os.path.join("snapshots", "watsonx.json.gz")
+
 class WatsonxClient:
     def __init__(self):
         self.api_key = os.getenv("WATSONX_API_KEY", "your_api_key")
@@ -31,19 +37,41 @@ class WatsonxClient:
         # You can make the model configurable
         # Using a model from the supported list for this environment
         self.model_id = "ibm/granite-3-8b-instruct"
-       
 
-    def generate_text(self, prompt, model_id=None):
+        self.mode = os.getenv("WATSONX_MODE", "live").lower()
+        if self.mode not in MODES:
+            raise ValueError(f"WATSONX_MODE must be one of {MODES}, got '{self.mode}'")
+
+        self.snapshots = None
+        if self.mode != "live":
+            snapshot_path = os.getenv("WATSONX_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+            self.snapshots = SnapshotStore(snapshot_path)
+            print(f"[WatsonX] {self.mode.capitalize()} mode using {snapshot_path}")
+
+
+    def generate_text(self, prompt, model_id=None, skill=None):
         """
         Generate text using Watsonx.ai
+        Args:
+            skill (str): Name of the calling skill, stored with recorded snapshots.
         """
+        model_id = model_id if model_id else self.model_id
+
+        if self.snapshots is not None:
+            recorded = self.snapshots.get(prompt, model_id, self.params)
+            if recorded is not None:
+                return recorded
+            if self.mode == "replay":
+                print("[WatsonX] ERROR: No snapshot recorded for this prompt")
+                return "Error: No recorded response for this prompt in replay mode"
+
         try:
-            print(f"[WatsonX] Using model: {model_id if model_id else self.model_id}")
+            print(f"[WatsonX] Using model: {model_id}")
             print(f"[WatsonX] Project ID: {self.project_id}")
             print(f"[WatsonX] Prompt length: {len(prompt)} chars")
             
             model = ModelInference(
-                model_id=model_id if model_id else self.model_id,
+                model_id=model_id,
                 params=self.params,
                 credentials=self.credentials,
                 project_id=self.project_id
@@ -55,6 +83,10 @@ class WatsonxClient:
                 print(f"[WatsonX] Response received: {len(response)} chars")
             else:
                 print("[WatsonX] WARNING: Empty response received")
+
+            # Only real answers are recorded, never errors or empty responses
+            if response and self.mode == "record":
+                self.snapshots.put(prompt, model_id, self.params, response, skill=skill)
                 
             return response if response else "Error: Empty response from Watsonx"
             